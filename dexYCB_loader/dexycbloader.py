@@ -3,15 +3,74 @@ from __future__ import annotations
 import os
 import yaml
 import torch
+import functools
 import argparse
 import numpy as np
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 from loader_utils import (JointReindexer, ycb_id_to_name,
-                          quaternionToAxisAngle, axisAngleToRotvec,
-                          MANO21, HO3D, JointConvention)
+                          quaternionToRotvec,
+                          MANO21, HO3D, MANO_TO_HO3D, JointConvention)
 from dexYCB_toolkit.layers.mano_layer import MANOLayer
 
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _YamlLoader
+
+
+@functools.lru_cache(maxsize=256)
+def _read_mano_betas(path: str) -> tuple:
+    """Betas of one calibration/mano_<id>/mano.yml, parsed once per process (subjects share them)."""
+    with open(path, "rb") as f:
+        y = yaml.load(f, Loader=_YamlLoader) or {}
+    return tuple(np.asarray(y["betas"], dtype=np.float32).reshape(-1).tolist())
+
+
+@functools.lru_cache(maxsize=64)
+def _get_mano_layer(side: str, betas: tuple, device: str = "cpu") -> MANOLayer:
+    """
+    Shared MANOLayer per (side, betas, device). Building one loads the MANO model files,
+    and DexYCB subjects reuse the same calibration across all their sequences.
+    """
+    return MANOLayer(side=side, betas=np.asarray(betas, dtype=np.float32)).to(device)
+
+
+@functools.lru_cache(maxsize=None)
+def _copy_stream(device: torch.device) -> "torch.cuda.Stream":
+    """One side stream per CUDA device for the H2D copies of MANO inputs."""
+    return torch.cuda.Stream(device=device)
+
+
+def _stage(pose: np.ndarray, trans: np.ndarray, device) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Start copying (T, 48) pose / (T, 3) trans to `device`. On CUDA the inputs are pinned
+    and copied with non_blocking=True on the device's copy stream, so the copy overlaps
+    whatever the current stream is computing (see `set_joints_batch`).
+    """
+    dev = torch.device(device)
+    p, t = torch.from_numpy(pose), torch.from_numpy(trans)
+    if dev.type != "cuda":
+        return p.to(dev), t.to(dev)
+    with torch.cuda.stream(_copy_stream(dev)):
+        return p.pin_memory().to(dev, non_blocking=True), t.pin_memory().to(dev, non_blocking=True)
+
+
+def _mano_forward(layer: MANOLayer, p: torch.Tensor, t: torch.Tensor) -> torch.Tensor:
+    """
+    Queue `layer` on inputs from `_stage` and return the joints, still on the device.
+    The forward runs on the current stream (where the layer's buffers live) after the
+    copies staged so far have landed.
+    """
+    if p.is_cuda:
+        current = torch.cuda.current_stream(p.device)
+        current.wait_stream(_copy_stream(p.device))
+        # p/t were allocated on the copy stream: keep them alive until this stream is done
+        p.record_stream(current)
+        t.record_stream(current)
+    with torch.no_grad():
+        return layer.forward(p, t)[1]
+
 
 class DexYCBLoader:
     """
@@ -22,7 +81,7 @@ class DexYCBLoader:
     - read_pose(): reads pose.npz, stores
     """
 
-    def __init__(self, sequence_name: str, order="mano"):
+    def __init__(self, sequence_name: str, order="mano", compute_joints: bool = True):
         # Resolve the sequence directory only (no I/O here)
         """
         `order` — Joint indexing convention
@@ -38,6 +97,9 @@ class DexYCBLoader:
         YAML compatibility
         `order` may be provided in configs as either a string ("mano"/"ho3d") or as a full
         object with `name` and `joints`:
+
+        `compute_joints=False` skips the MANO pass in read_pose(); joints are then
+        filled in later, e.g. by `DexYCBLoader.set_joints_batch`.
         """
 
         assert 'DEX_YCB_DIR' in os.environ, "environment variable 'DEX_YCB_DIR' is not set"
@@ -47,6 +109,7 @@ class DexYCBLoader:
         self.seq_dir = (self.root / sequence_name).resolve()
         self.seq_name = sequence_name
         self.order = order
+        self.compute_joints = compute_joints
 
         # Placeholders
         self.handBeta: Optional[np.ndarray] = None
@@ -63,6 +126,7 @@ class DexYCBLoader:
         self.handJoints3D = None
         self.ycb_ids: Optional[int] = None
         self.grasp_idx: Optional[int] = None
+        self._base: Optional[Dict[str, Any]] = None  # see _frame_base()
 
         # Perform reads
         self.read_meta()
@@ -77,8 +141,8 @@ class DexYCBLoader:
         if not meta_path.exists():
             raise FileNotFoundError(f"meta.yml not found: {meta_path}")
 
-        with meta_path.open("r", encoding="utf-8") as f:
-            meta = yaml.safe_load(f)
+        with meta_path.open("rb") as f:
+            meta = yaml.load(f, Loader=_YamlLoader)
 
         self.set_mano_beta(meta)
         self.set_ycb(meta)
@@ -116,16 +180,11 @@ class DexYCBLoader:
         Read MANO beta values from each mano.yml discovered by read_meta().
         Returns a list of np.ndarray with shape (10,) dtype float32.
         """
-        # Build MANO beta absolute paths from meta['mano_calib']
+        # Build the MANO beta path from meta['mano_calib'] (the first calibration is used)
         calib_ids = list(meta.get("mano_calib", []))
-        mano_beta_paths = [
-            (self.root / "calibration" / f"mano_{cid}" / "mano.yml").resolve()
-            for cid in calib_ids
-        ]
-        mano_beta_path = Path(mano_beta_paths[0])
-        with mano_beta_path.open("r", encoding="utf-8") as f:
-            y = yaml.safe_load(f) or {}
-        betas = np.asarray(y["betas"], dtype=np.float32).reshape(-1)
+        mano_beta_path = self.root / "calibration" / f"mano_{calib_ids[0]}" / "mano.yml"
+        # Cached per calibration file; each loader gets its own array
+        betas = np.asarray(_read_mano_betas(os.fspath(mano_beta_path.resolve())), dtype=np.float32)
         self.handBeta = betas
 
         return betas
@@ -150,10 +209,12 @@ class DexYCBLoader:
         with np.load(pose_path, allow_pickle=True) as z:
             if "pose_m" not in z or "pose_y" not in z:
                 raise KeyError(f"'pose_m' or 'pose_y' missing in {pose_path}. Keys={list(z.keys())}")
-            pose_m = z["pose_m"].astype(np.float32)  # (T, H, 51)
-            pose_y = z["pose_y"].astype(np.float32)  # (T, O, 7)
+            # DexYCB stores float32 already: cast (copy) only if the dtype differs
+            pose_m = z["pose_m"].astype(np.float32, copy=False)  # (T, H, 51)
+            pose_y = z["pose_y"].astype(np.float32, copy=False)  # (T, O, 7)
             self.set_mano(pose_m)
-            self.set_joints()
+            if self.compute_joints:
+                self.set_joints()
             self.set_ycb_pos(pose_y)
         return {"pose_m": pose_m, "pose_y":pose_y}
 
@@ -172,16 +233,49 @@ class DexYCBLoader:
 
     def set_joints(self, device: str = "cpu"):
         """Run MANO and cache joints for all frames (meters)."""
-        # Convert to tensors on the target device
-        p = torch.from_numpy(self.handPose).to(device)
-        t = torch.from_numpy(self.handTrans).to(device)
+        # Fetch the (cached) MANO wrapper and evaluate
+        layer = _get_mano_layer(self.side, tuple(self.handBeta.tolist()), device)
+        joints = _mano_forward(layer, *_stage(self.handPose, self.handTrans, device)).cpu()
 
-        # Build MANO wrapper and evaluate
-        layer = MANOLayer(side=self.side, betas=self.handBeta)
-        vertices, joints = layer.forward(p, t)
+        return self._store_joints(joints)
 
-        # Store as numpy for downstream use
-        self.handJoints3D = joints.detach().cpu().numpy().astype(np.float64, copy=False)
+    @staticmethod
+    def set_joints_batch(loaders: Sequence["DexYCBLoader"], device: str = "cuda") -> None:
+        """
+        Run MANO for many loaders at once (e.g. all sequences of a subject): frames of
+        loaders sharing (side, betas) are concatenated into one (sum T, 48) batch, so
+        each group costs a single forward pass. Joints are scattered back to each loader.
+        On CUDA the next group's inputs are copied on a side stream while the current
+        group's forward runs.
+        """
+        groups: Dict[tuple, List["DexYCBLoader"]] = {}
+        for loader in loaders:
+            groups.setdefault((loader.side, tuple(loader.handBeta.tolist())), []).append(loader)
+
+        batches = [(side, betas, group,
+                    np.concatenate([loader.handPose for loader in group]),
+                    np.concatenate([loader.handTrans for loader in group]))
+                   for (side, betas), group in groups.items()]
+
+        staged = _stage(batches[0][3], batches[0][4], device) if batches else None
+        for i, (side, betas, group, _, _) in enumerate(batches):
+            layer = _get_mano_layer(side, betas, device)
+            joints = _mano_forward(layer, *staged)
+            # On CUDA the next group's H2D copy runs on the copy stream during this forward
+            if i + 1 < len(batches):
+                staged = _stage(batches[i + 1][3], batches[i + 1][4], device)
+            joints = joints.cpu()
+
+            start = 0
+            for loader in group:
+                n = loader.handPose.shape[0]
+                loader._store_joints(joints[start:start + n])
+                start += n
+
+    def _store_joints(self, joints: torch.Tensor) -> np.ndarray:
+        """Store MANO joints (T, 21, 3) as float64 numpy, reindexed to `self.order`."""
+        # Store as C-contiguous numpy (per-frame rows then pickle out-of-band under protocol 5)
+        self.handJoints3D = np.ascontiguousarray(joints.detach().cpu().numpy(), dtype=np.float64)
 
         order = self.order
         # Normalize order into a JointConvention (or identity)
@@ -191,7 +285,8 @@ class DexYCBLoader:
 
         # Apply mapping only if we actually have a non-identity convention
         if isinstance(order, JointConvention):
-            reindexer = JointReindexer(MANO21, order)
+            # HO3D uses the module-level permutation built once at import
+            reindexer = MANO_TO_HO3D if order is HO3D else JointReindexer(MANO21, order)
             self.handJoints3D = reindexer.apply(self.handJoints3D)
 
         return self.handJoints3D
@@ -229,30 +324,30 @@ class DexYCBLoader:
 
         objQuat = X[:, :4].astype(np.float64)  # w, x, y, z
         objTrans = X[:, 4:7].astype(np.float64)  # tx, ty, tz
-        axes, angles = quaternionToAxisAngle(objQuat)
-        objRot = axisAngleToRotvec(axes, angles)
+        objRot = quaternionToRotvec(objQuat)
 
         return {"objRot": objRot, "objTrans": objTrans, "objQuat": objQuat}
 
+    # Properties cannot take arguments: index the result for one frame, e.g. get_handPose[i]
     @property
-    def get_handPose(self, frame=None):
-        return self.handPose if frame is None else self.handPose[frame]   # (T,48) or (48,)
+    def get_handPose(self):
+        return self.handPose   # (T,48)
 
     @property
-    def get_handTrans(self, frame=None):
-        return self.handTrans if frame is None else self.handTrans[frame]   # (T,3) or (3,)
+    def get_handTrans(self):
+        return self.handTrans   # (T,3)
 
     @property
-    def getHandJoint3D(self, frame=None):
-        return self.handJoints3D if frame is None else self.handJoints3D[frame]  # (T,21,3) or (21,3)
+    def getHandJoint3D(self):
+        return self.handJoints3D  # (T,21,3)
 
     @property
-    def get_objTrans(self, frame=None):
-        return self.objTrans if frame is None else self.objTrans[frame]   # (T,3) or (3,)
+    def get_objTrans(self):
+        return self.objTrans   # (T,3)
 
     @property
-    def get_objRot(self, frame=None):
-        return self.objRot if frame is None else self.objRot[frame]  # (T,3,3) or (3,3)
+    def get_objRot(self):
+        return self.objRot  # (T,3)
 
     @property
     def get_side(self):
@@ -296,10 +391,37 @@ class DexYCBLoader:
         raise TypeError(f"Unsupported order type: {type(order).__name__}")
 
 
+    def _frame_base(self) -> Dict[str, Any]:
+        """Sequence-constant fields shared by every per-frame dict (built once, on first use)."""
+        if self._base is None:
+            self._base = {
+                "seqName": self.seq_name,
+                "handBeta": self.handBeta,  # (10,)
+                "objName": self.objName,  # str
+                "side": self.side,
+                "order": self.get_joint_order_name,
+            }
+        return self._base
+
+    def as_batch(self, start: int = 0, stop: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Per-frame arrays for frames [start, stop), stacked along the leading axis.
+        Slices are views of the sequence arrays (no copy); row i is what as_dict(start + i) holds.
+        """
+        sl = slice(start, stop)
+        return {
+            "handPose": self.handPose[sl],  # (N, 48)
+            "handTrans": self.handTrans[sl],  # (N, 3)
+            "objRot": self.objRot[sl],  # (N, 3)
+            "objTrans": self.objTrans[sl],  # (N, 3)
+            "handJoints3D": self.handJoints3D[sl],  # (N, 21, 3)
+        }
+
     def as_dict(self, frame=None):
         """
-        Return a simple dict of core fields for this sequence.
-        Uses the existing property getters (full sequences).
+        Return a simple dict of core fields for this sequence (full sequences),
+        or for one frame when `frame` is given. Per-frame dicts copy the cached
+        sequence-constant fields and only slice the per-frame arrays.
         """
         if frame is None:
             return {
@@ -317,17 +439,13 @@ class DexYCBLoader:
             }
         else:
             return {
-                "seqName": self.seq_name,
-                "handPose": self.get_handPose[frame],  # (T, 48)
-                "handTrans": self.get_handTrans[frame],  # (3,)
-                "handBeta": self.get_handBeta,  # (10,)
-                "objRot": self.get_objRot[frame],  # (3,)
-                "objTrans": self.get_objTrans[frame],  # (T, 3)
-                "objName": self.get_ycb_name,  # str
-                "handJoints3D": self.getHandJoint3D[frame],  # (T, 21, 3)
-                "side": self.get_side,
+                **self._frame_base(),
+                "handPose": self.handPose[frame],  # (48,)
+                "handTrans": self.handTrans[frame],  # (3,)
+                "objRot": self.objRot[frame],  # (3,)
+                "objTrans": self.objTrans[frame],  # (3,)
+                "handJoints3D": self.handJoints3D[frame],  # (21, 3)
                 "frame": frame,
-                "order": self.get_joint_order_name,
             }
 
 
@@ -342,7 +460,7 @@ def main():
     print("[env] DEX_YCB_DIR =", os.environ.get("DEX_YCB_DIR", "<unset>"))
 
     loader = DexYCBLoader(args.seq)
-    d = loader.as_dict  # use the property
+    d = loader.as_dict()
 
     print(f"[seq] path        : {loader.seq_dir}")
     print(f"[mano] side       : {loader.get_side}")
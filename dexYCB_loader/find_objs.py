@@ -1,9 +1,27 @@
+import io
 import csv
 import argparse
+from collections import defaultdict
 from pathlib import Path
-from typing import Dict, List, Tuple
-from dexycbloader import DexYCBLoader
-from type_split import HandSplitIndex
+from concurrent.futures import ThreadPoolExecutor
+from typing import DefaultDict, Dict, List, Optional, Tuple
+from loader_utils import ycb_id_to_name
+from type_split import HandSplitIndex, load_yaml
+
+
+def _load_obj(seq_ref: Path) -> Tuple[Path, Optional[str], Optional[Exception]]:
+    """
+    Read one sequence's grasped object and return (seq_ref, object name, error); never raises.
+    Only meta.yml is parsed: a full DexYCBLoader would also load pose.npz and run MANO.
+    """
+    try:
+        meta = load_yaml(Path(seq_ref) / "meta.yml")
+        ycb_ids, grasp_ind = list(meta["ycb_ids"]), int(meta["ycb_grasp_ind"])
+        if not 0 <= grasp_ind < len(ycb_ids):
+            raise ValueError(f"`ycb_grasp_ind` ({grasp_ind}) out of range for ycb_ids (len={len(ycb_ids)})")
+        return seq_ref, ycb_id_to_name(ycb_ids[grasp_ind]), None
+    except Exception as e:
+        return seq_ref, None, e
 
 
 class ObjFinder:
@@ -12,27 +30,26 @@ class ObjFinder:
     group them by object, and write results into CSV files.
     """
 
-    def __init__(self, yml_path: Path, side: str = "right", out_dir: Path = Path("dexYCB_dataset/objs")):
+    def __init__(self, yml_path: Path, side: str = "right", out_dir: Path = Path("dexYCB_dataset/objs"),
+                 workers: int = 16):
         self.project_root = Path(__file__).resolve().parents[1]
         self.yml_path = Path(yml_path)
         self.side = side
+        self.workers = workers  # threads opening sequences concurrently
         self.out_dir = self.project_root / out_dir
-        self.obj_map: Dict[str, List[Tuple[str, str]]] = {}  # object -> list of (subject, sequence)
+        self.obj_map: DefaultDict[str, List[Tuple[str, str]]] = defaultdict(list)  # object -> list of (subject, sequence)
 
     def scan_sequences(self):
         """Scan all sequences and populate self.obj_map grouped by object name."""
         seq_paths = HandSplitIndex.read_paths(self.yml_path, side=self.side, absolute=True)
 
-        for seq_ref in seq_paths:
-            try:
-                loader = DexYCBLoader(str(seq_ref))  # auto-reads meta.yml
-                obj_name = loader.objName
-                subject = seq_ref.parent.name
-                sequence = seq_ref.name
-                self.obj_map.setdefault(obj_name, []).append((subject, sequence))
-            except Exception as e:
-                print(f"[warn] Skipping {seq_ref}: {e}")
-                continue
+        # Loader construction is I/O bound: open sequences concurrently, group here in order
+        with ThreadPoolExecutor(max_workers=self.workers) as ex:
+            for seq_ref, obj_name, err in ex.map(_load_obj, seq_paths):
+                if err is not None:
+                    print(f"[warn] Skipping {seq_ref}: {err}")
+                    continue
+                self.obj_map[obj_name].append((seq_ref.parent.name, seq_ref.name))
 
     def write_csvs(self):
         """Write one CSV file per object into self.out_dir."""
@@ -40,10 +57,13 @@ class ObjFinder:
             out_dir = self.out_dir / f"{obj_name}"
             out_dir.mkdir(parents=True, exist_ok=True)
             csv_path = out_dir / f"{obj_name}.csv"
+            # Format in memory, then a single write per file
+            buf = io.StringIO(newline="")
+            writer = csv.writer(buf)
+            writer.writerow(["subject", "sequence"])
+            writer.writerows(records)
             with csv_path.open("w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(["subject", "sequence"])
-                writer.writerows(records)
+                f.write(buf.getvalue())
             print(f"[info] Wrote {len(records)} sequences to {csv_path}")
 
     def get_results(self) -> Dict[str, List[str]]:
@@ -66,11 +86,14 @@ def read_sequence(obj_name: str, out_dir: Path = Path("dexYCB_dataset/objs")) ->
     if not csv_path.exists():
         raise FileNotFoundError(f"CSV not found at {csv_path}")
 
+    # Plain two-column file written by ObjFinder (no quoting): split lines directly
     sequences: List[str] = []
-    with csv_path.open("r", newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            sequences.append(f"{row['subject']}/{row['sequence']}")
+    with csv_path.open("r", encoding="utf-8") as f:
+        next(f, None)  # header: subject,sequence
+        for line in f:
+            line = line.strip()
+            if line:
+                sequences.append(line.replace(",", "/", 1))
     print(f"[info] {len(sequences)} sequences loaded for {obj_name}")
     return sequences
 
@@ -1,6 +1,7 @@
 from __future__ import annotations
 import numpy as np
-from typing import Dict, List, Sequence, Tuple, Iterable
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Iterable
 import torch
 
 
@@ -39,23 +40,60 @@ class JointReindexer:
         self.src = src
         self.dst = dst
         N = dst.size
-        self.perm = np.fromiter(
-            (src.sem_to_idx()[dst.idx_to_sem()[i]] for i in range(N)),
-            dtype=int, count=N
-        )
+        s2i, i2s = src.sem_to_idx(), dst.idx_to_sem()
+        # intp: native index width, NumPy's fast path for take/indexing
+        self._set_perm(np.array([s2i[i2s[i]] for i in range(N)], dtype=np.intp))
+
+    @classmethod
+    def from_perm(cls, src: JointConvention, dst: JointConvention, perm: Sequence[int]) -> "JointReindexer":
+        """Build a mapper from a precomputed permutation (dst index -> src index), skipping the lookups."""
+        obj = cls.__new__(cls)
+        obj.src, obj.dst = src, dst
+        obj._set_perm(np.array(perm, dtype=np.intp))
+        return obj
+
+    def _set_perm(self, perm: np.ndarray) -> None:
+        """Install `perm` as a read-only C-contiguous intp array and reset derived caches."""
+        self.perm = np.ascontiguousarray(perm, dtype=np.intp)
+        self.perm.flags.writeable = False
+        self._perm_t = torch.as_tensor(self.perm.copy(), dtype=torch.long)
+        self._perm_dev: Dict[torch.device, torch.Tensor] = {self._perm_t.device: self._perm_t}  # see apply_torch
+        self._inv: "JointReindexer | None" = None
 
     def apply(self, joints: np.ndarray) -> np.ndarray:
         """Reorder joints: joints shape (..., N, D)."""
         if joints.shape[-2] != self.perm.size:
             raise ValueError(f"Expected joints.shape[-2]=={self.perm.size}, got {joints.shape[-2]}")
-        return joints[..., self.perm, :]
+        return np.take(joints, self.perm, axis=-2)
+
+    def apply_out(self, joints: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """Like `apply`, but writes into a preallocated `out` (same shape as `joints`)."""
+        if joints.shape[-2] != self.perm.size:
+            raise ValueError(f"Expected joints.shape[-2]=={self.perm.size}, got {joints.shape[-2]}")
+        # perm is always in range; mode="clip" lets take write into `out` without buffering
+        np.take(joints, self.perm, axis=-2, out=out, mode="clip")
+        return out
+
+    def apply_torch(self, joints: torch.Tensor) -> torch.Tensor:
+        """Reorder joints on the tensor's own device: joints shape (..., N, D)."""
+        if joints.shape[-2] != self.perm.size:
+            raise ValueError(f"Expected joints.shape[-2]=={self.perm.size}, got {joints.shape[-2]}")
+        # The index is copied to each device once, not on every call
+        idx = self._perm_dev.get(joints.device)
+        if idx is None:
+            idx = self._perm_dev[joints.device] = self._perm_t.to(joints.device)
+        return joints.index_select(dim=-2, index=idx)
 
     def inverse(self) -> "JointReindexer":
-        """Return the inverse mapper (dst -> src)."""
-        inv = JointReindexer.__new__(JointReindexer)
-        inv.src, inv.dst = self.dst, self.src
-        inv.perm = np.argsort(self.perm)
-        return inv
+        """Return the inverse mapper (dst -> src); built once, then cached."""
+        if self._inv is None:
+            # perm is a permutation of 0..N-1: invert it with one O(N) scatter
+            perm = np.empty_like(self.perm)
+            perm[self.perm] = np.arange(self.perm.size)
+            inv = JointReindexer.from_perm(self.dst, self.src, perm)
+            inv._inv = self
+            self._inv = inv
+        return self._inv
 
     def __repr__(self):
         return f"JointReindexer({self.src.name} -> {self.dst.name}, N={self.perm.size})"
@@ -87,7 +125,10 @@ HO3D = JointConvention(
 )
 
 # ---- Ready-to-use mappers ----
-MANO_TO_HO3D = JointReindexer(MANO21, HO3D)
+# Constant permutation, equal to JointReindexer(MANO21, HO3D).perm (checked in __main__ below)
+_MANO_TO_HO3D_PERM = (0, 5, 6, 7, 9, 10, 11, 17, 18, 19, 13, 14, 15, 1, 2, 3, 4, 8, 12, 16, 20)
+
+MANO_TO_HO3D = JointReindexer.from_perm(MANO21, HO3D, _MANO_TO_HO3D_PERM)
 HO3D_TO_MANO = MANO_TO_HO3D.inverse()
 
 # Optional convenience wrappers
@@ -97,14 +138,27 @@ def mano_to_ho3d(x: np.ndarray) -> np.ndarray:
 def ho3d_to_mano(x: np.ndarray) -> np.ndarray:
     return HO3D_TO_MANO.apply(x)
 
+def mano_to_ho3d_torch(x: torch.Tensor) -> torch.Tensor:
+    return MANO_TO_HO3D.apply_torch(x)
+
+def ho3d_to_mano_torch(x: torch.Tensor) -> torch.Tensor:
+    return HO3D_TO_MANO.apply_torch(x)
+
 
 class YCBRegistry:
-    """Minimal OOP wrapper around the YCB id<->name mapping."""
-    __slots__ = ("_id_to_name", "_name_to_id")
+    """Minimal OOP wrapper around the YCB id<->name mapping (read-only)."""
+    __slots__ = ("_id_to_name", "_name_to_id_cache")
 
     def __init__(self, id_to_name: Dict[int, str]):
-        self._id_to_name: Dict[int, str] = {int(k): str(v) for k, v in id_to_name.items()}
-        self._name_to_id: Dict[str, int] = {v: k for k, v in self._id_to_name.items()}
+        self._id_to_name: Mapping[int, str] = MappingProxyType({int(k): str(v) for k, v in id_to_name.items()})
+        self._name_to_id_cache: Optional[Mapping[str, int]] = None
+
+    @property
+    def _name_to_id(self) -> Mapping[str, int]:
+        """Reverse map, built on first use (most callers only go id -> name)."""
+        if self._name_to_id_cache is None:
+            self._name_to_id_cache = MappingProxyType({v: k for k, v in self._id_to_name.items()})
+        return self._name_to_id_cache
 
     # --- Lookups ---
     def id_to_name(self, ycb_id: int) -> str:
@@ -197,30 +251,61 @@ def quaternionToAxisAngle(P: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
     e = P[..., 1:4]
     n = np.linalg.norm(e, axis=-1)
 
-    axes = np.zeros(P.shape[:-1] + (3,), dtype=float)
-    nz = n != 0
-    axes[nz] = e[nz] / n[nz, None]
-    axes[~nz] = np.array([1.0, 0.0, 0.0])
+    # Branchless: safe divide, then substitute the default axis where ||e|| == 0
+    nz = n > 0
+    n_safe = np.where(nz, n, 1.0)
+    axes = np.where(nz[..., None], e / n_safe[..., None], np.array([1.0, 0.0, 0.0]))
 
-    angles = np.zeros_like(n)
-    w_zero = e0 == 0
-    angles[w_zero] = np.pi
-    mask = ~w_zero
-    angles[mask] = 2.0 * np.arctan(n[mask] / e0[mask])
+    # 2*arctan(n/e0) without the divide: flipping both arguments by sign(e0) keeps
+    # the angle in (-pi, pi) (minimal rotation) for negative scalar parts
+    s = np.where(e0 < 0, -1.0, 1.0)
+    angles = np.where(e0 == 0, np.pi, 2.0 * np.arctan2(s * n, s * e0))
 
     return axes, angles
 
 
-def axisAngleToRotvec(axes: np.ndarray, angles: np.ndarray) -> np.ndarray:
+def axisAngleToRotvec(axes: np.ndarray, angles: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
     """
     Convert (axis, angle) -> rotation vector r = axis * angle.
     axes:  (..., 3)
     angles: (...)   (radians)
+    out:   optional (..., 3) float buffer to write into (reuse it across calls)
     returns: (..., 3) with ||r|| = angle
     """
     axes = np.asarray(axes, dtype=float)
     angles = np.asarray(angles, dtype=float)
-    return axes * angles[..., None]
+    if out is None:
+        out = np.empty_like(axes)
+    np.multiply(axes, angles[..., None], out=out)
+    return out
+
+
+def quaternionToRotvec(P: np.ndarray) -> np.ndarray:
+    """
+    Vectorized quaternion -> rotation vector in one pass.
+
+    Same result as axisAngleToRotvec(*quaternionToAxisAngle(P)) without the
+    intermediate unit-axis array: r = e * (angle / ||e||).
+
+    P : (..., 4) quaternions, scalar first
+    returns: (..., 3)
+    """
+    P = np.asarray(P, dtype=float)
+
+    assert P.shape[-1] == 4, "last dim must be 4"
+    e0 = P[..., 0]
+    e = P[..., 1:4]
+    n = np.linalg.norm(e, axis=-1)
+
+    # Same angle as quaternionToAxisAngle: 2*arctan(n/e0), in (-pi, pi)
+    s = np.where(e0 < 0, -1.0, 1.0)
+    angles = np.where(e0 == 0, np.pi, 2.0 * np.arctan2(s * n, s * e0))
+    nz = n > 0
+    scale = np.where(nz, angles / np.where(nz, n, 1.0), 0.0)
+    out = e * scale[..., None]
+    # ||e|| == 0 keeps the default x axis of quaternionToAxisAngle
+    out[..., 0] += np.where(nz, 0.0, angles)
+    return out
 
 
 # ---- Optional tiny check ----
@@ -232,3 +317,4 @@ if __name__ == "__main__":
     print(MANO_TO_HO3D)
     print("perm:", MANO_TO_HO3D.perm.tolist())
     print("roundtrip ok:", np.array_equal(x, x_back))
+    print("constant perm ok:", np.array_equal(MANO_TO_HO3D.perm, JointReindexer(MANO21, HO3D).perm))
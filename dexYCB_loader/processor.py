@@ -1,13 +1,39 @@
 #!/usr/bin/env python3
+import io
 import os
-import yaml
+import json
+import torch
+import queue
 import pickle
+import logging
+import threading
 import argparse
+import functools
+import numpy as np
 from pathlib import Path
-from typing import Any, Dict, List, Union, Optional
+from itertools import chain, repeat
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Union, Optional
 from loader_utils import JointConvention
 from dexycbloader import DexYCBLoader
-from type_split import HandSplitIndex
+from type_split import HandSplitIndex, load_yaml
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for msgpack=True
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for zstd=True
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+_SHARED = "shared.pkl"  # per-sequence constant fields for shared=True
+_STAMP = ".export.json"  # per-sequence completion stamp, see DexYCBPickleExporter._up_to_date
+_NDARRAY_EXT = 42  # msgpack ExtType code for (dtype, shape, raw bytes) ndarrays
 
 
 class DexYCBPickleExporter:
@@ -16,26 +42,60 @@ class DexYCBPickleExporter:
 
     - Preserves `subject/sequence` path by default:
         out_root / side / subject / sequence / meta / 0000.pkl
+    - With `per_frame=False`, writes one stream per sequence instead:
+        out_root / side / subject / sequence / meta / frames.pkl
+      (read it back with `iter_frames`).
+    - With `protocol5=True`, NumPy payloads are written out-of-band (pickle
+      protocol 5) to a `.buf` sidecar next to each `.pkl` (see `load_frame`).
+    - With `npz=True`, writes whole-sequence arrays instead of per-frame records:
+        out_root / side / subject / sequence / meta / seq.npz + meta.json
+      (read it back with `load_sequence`).
+    - With `msgpack=True`, frames are msgpack-encoded (`.msgpack` instead of `.pkl`,
+      arrays as raw-buffer ext types); `load_frame` / `iter_frames` read both formats.
+    - With `zstd=True`, pickles are zstd-compressed (`.pkl.zst`); per-frame files share a
+      dictionary trained on the sequence's first frames (`meta/zstd.dict`).
+    - With `shared=True`, per-frame pickles reference the sequence-constant fields
+      (seqName, handBeta, objName, side, order) stored once in `meta/shared.pkl`
+      instead of re-encoding them in every frame (`load_frame` resolves them). Only
+      plain per-frame pickles support it: combining it with per_frame=False, npz,
+      msgpack or zstd raises ValueError.
+    - Every exported sequence gets a `meta/.export.json` stamp; with `skip_existing=True`,
+      sequences whose stamp matches the current settings and is newer than the
+      sequence's meta.yml / pose.npz / MANO calibration are skipped (e.g. when
+      re-running after a crash).
     """
 
     def __init__(self, out_root: Union[str, Path] = "dexYCB_dataset", side: str = "left", order="ho3d",
         yml: str = None, cfg: Optional[Union[str, Path]] = None,  # optional YAML path
+        workers: Optional[int] = None, per_frame: bool = True, protocol5: bool = False,
+        device: str = "cpu", npz: bool = False, msgpack: bool = False, zstd: bool = False,
+        skip_existing: bool = False, shared: bool = False,
     ):
         # Defaults from args
         self.out_root = Path(out_root)
         self.side: str = side
         self.order = order
+        self.workers = workers  # process pool size; None -> os.cpu_count(), 1 -> serial
+        self.per_frame = per_frame  # False -> one frames.pkl per sequence
+        self.protocol5 = protocol5  # True -> out-of-band array buffers in a .buf sidecar
+        self.device = device  # "cuda[:N]" -> batched MANO per subject on the GPU
+        self.npz = npz  # True -> seq.npz (T-major arrays) + meta.json per sequence
+        self.msgpack = msgpack  # True -> .msgpack frames instead of pickles
+        self.zstd = zstd  # True -> zstd-compressed pickles (.pkl.zst)
+        self.skip_existing = skip_existing  # True -> skip sequences whose export stamp is current
+        self.shared = shared  # True -> constant fields in shared.pkl, referenced by persistent id
         self.project_root = Path(__file__).resolve().parents[1]
 
         if yml is None:
             self.yml =  self.project_root / "dexYCB_dataset" / "config" / "hand_splits.yaml"
-            print(self.yml)
+            logger.debug("using default hand splits: %s", self.yml)
         else:
             self.yml: Optional[Path] = self.project_root / Path(yml)  # path to hand_splits.yaml (optional)
 
         # If a YAML config path exists, load and override from it
         if cfg is not None:
             self.from_yaml(cfg)
+        self._check_options()
 
     def from_yaml(self, cfg: Union[str, Path]):
         """
@@ -45,9 +105,18 @@ class DexYCBPickleExporter:
           - side: "right"|"left"
           - order: "mano"|"ho3d"|{name:..., joints:{...}} | (alias) JointConvention: {...}
           - yml | hand_splits | hand_splits_yaml: path to hand_splits.yaml
+          - workers: int, number of processes used by process_all
+          - per_frame: bool, False writes a single frames.pkl per sequence
+          - protocol5: bool, True writes NumPy buffers out-of-band to .buf sidecars
+          - device: "cpu" | "cuda[:N]", where MANO runs (cuda batches it per subject)
+          - npz: bool, True writes one seq.npz + meta.json per sequence instead of pickles
+          - msgpack: bool, True writes msgpack frames (requires the msgpack package)
+          - zstd: bool, True zstd-compresses the pickles (requires the zstandard package)
+          - skip_existing: bool, True skips sequences already exported with the same settings
+          - shared: bool, True stores per-sequence constant fields once in shared.pkl
         """
         cfg = Path(cfg)
-        print("Reading settings from {}".format(cfg))
+        logger.debug("reading settings from %s", cfg)
 
         # If it's not absolute, resolve it relative to *this* file's directory
         if not cfg.is_absolute():
@@ -56,7 +125,7 @@ class DexYCBPickleExporter:
         if not Path(cfg).exists():
             raise FileNotFoundError(cfg)
 
-        cfg = yaml.safe_load(cfg.read_text()) or {}
+        cfg = load_yaml(cfg) or {}
 
         # out_root (resolve relative to YAML)
         out_root_val = cfg.get("out_root", self.out_root)
@@ -80,30 +149,119 @@ class DexYCBPickleExporter:
             yml_path = Path(yml_val)
             self.yml = yml_path if yml_path.is_absolute() else (self.project_root / yml_path).resolve()
 
+        # workers
+        if cfg.get("workers") is not None:
+            self.workers = int(cfg["workers"])
+
+        # per_frame
+        self.per_frame = bool(cfg.get("per_frame", self.per_frame))
+
+        # protocol5
+        self.protocol5 = bool(cfg.get("protocol5", self.protocol5))
+
+        # device
+        self.device = str(cfg.get("device", self.device))
+
+        # npz
+        self.npz = bool(cfg.get("npz", self.npz))
+
+        # msgpack
+        self.msgpack = bool(cfg.get("msgpack", self.msgpack))
+
+        # zstd
+        self.zstd = bool(cfg.get("zstd", self.zstd))
+
+        # skip_existing
+        self.skip_existing = bool(cfg.get("skip_existing", self.skip_existing))
+
+        # shared
+        self.shared = bool(cfg.get("shared", self.shared))
+
+        self._check_options()
         return self
 
+    def _check_options(self) -> None:
+        """Reject option combinations that would otherwise be silently ignored."""
+        if self.shared:
+            others = [name for name, on in (("per_frame=False", not self.per_frame), ("npz", self.npz),
+                                            ("msgpack", self.msgpack), ("zstd", self.zstd)) if on]
+            if others:
+                raise ValueError(f"shared=True applies to per-frame pickles only; "
+                                 f"it cannot be combined with {', '.join(others)}")
+
     # ------------------------ path helpers ------------------------
-    def out_dir(self, seq_ref: Union[str, Path], side: str) -> Path:
+    def out_dir(self, seq_ref: Union[str, Path], side: str, create: bool = True) -> Path:
         """
-        Build (and create) the output directory for a given sequence.
+        Build (and, unless `create` is False, create) the output directory for a given sequence.
         """
-        p = Path(seq_ref)
-        parts = p.parts  # tuple of path components
-
-        if len(parts) >= 2:
-            # Preserve the canonical DexYCB structure: "<subject>/<sequence>"
-            key = Path(parts[-2]) / parts[-1]
-        else:
-            # Only a single component was provided; use it as the sequence name
-            key = Path(p.name)
+        # Plain string ops: keep the last two components, i.e. "<subject>/<sequence>"
+        # (or just the sequence name if only one component was provided)
+        ref = os.fspath(seq_ref).replace("\\", "/").rstrip("/")
+        key = [part for part in ref.rsplit("/", 2)[-2:] if part]
 
         # Compose: out_root/<side>/<subject>/<sequence>/meta/
         # `self.side` typically "left" or "right"
-        out_dir = self.out_root / side / key / "meta"
+        out_dir = os.path.join(self.out_root, side, *key, "meta")
 
         # Ensure the directory exists (create parents as needed)
-        out_dir.mkdir(parents=True, exist_ok=True)
-        return out_dir
+        if create:
+            os.makedirs(out_dir, exist_ok=True)
+        return Path(out_dir)
+
+    # ------------------------ export stamps ------------------------
+    @property
+    def fingerprint(self) -> Dict[str, Any]:
+        """Settings that change the exported files; stored in each sequence's stamp."""
+        order = self.order
+        if isinstance(order, JointConvention):
+            order = {"name": order.name, "joints": order.layout}
+        return {"order": order, "per_frame": self.per_frame, "protocol5": self.protocol5,
+                "npz": self.npz, "msgpack": self.msgpack, "zstd": self.zstd, "shared": self.shared}
+
+    @staticmethod
+    def _sources(loader_key: str) -> List[str]:
+        """
+        Dataset files a sequence's export is derived from: its meta.yml and pose.npz, plus
+        the MANO calibration(s) named in `mano_calib` (handBeta and the joints come from them).
+        """
+        root = os.environ.get("DEX_YCB_DIR", "")
+        seq_dir = os.path.join(root, loader_key)
+        meta = os.path.join(seq_dir, "meta.yml")
+        calib = [os.path.join(root, "calibration", f"mano_{cid}", "mano.yml")
+                 for cid in (load_yaml(meta) or {}).get("mano_calib", [])]
+        return [meta, os.path.join(seq_dir, "pose.npz"), *calib]
+
+    def _up_to_date(self, seq_ref: Union[str, Path], side: str) -> bool:
+        """
+        True if the sequence's stamp matches `fingerprint` and is strictly newer than
+        its sources (a tie re-exports: coarse mtimes can hide an edit in the same tick).
+        """
+        stamp = self.out_dir(seq_ref, side, create=False) / _STAMP
+        try:
+            if json.loads(stamp.read_text()) != self.fingerprint:
+                return False
+            done = stamp.stat().st_mtime_ns
+            loader_key = str(seq_ref).replace(os.sep, "/")
+            return all(os.stat(src).st_mtime_ns < done for src in self._sources(loader_key))
+        except (OSError, ValueError):  # no/unreadable stamp or missing source: export again
+            return False
+
+    def _write_stamp(self, seq_ref: Union[str, Path], side: str) -> None:
+        """Mark a sequence as fully exported (written last, after all of its frames)."""
+        stamp = self.out_dir(seq_ref, side) / _STAMP
+        stamp.write_text(json.dumps(self.fingerprint))
+
+    # ------------------------ serialization helpers ------------------------
+    @property
+    def protocol(self) -> int:
+        """Pickle protocol; out-of-band buffers require protocol 5."""
+        return 5 if self.protocol5 else pickle.HIGHEST_PROTOCOL
+
+    def _open_buffers(self, out_file: Union[str, Path], buffering: int = -1):
+        """Open the `.buf` sidecar for `out_file` when protocol5 is enabled (else a null context)."""
+        if not self.protocol5:
+            return nullcontext()
+        return open(os.path.splitext(out_file)[0] + ".buf", "wb", buffering=buffering)
 
     # ------------------------ core work ------------------------
     def process(self, seq_ref: Union[str, Path], side: str) -> Path:
@@ -111,42 +269,181 @@ class DexYCBPickleExporter:
         Process one sequence:
         - Build a loader key with forward slashes (DexYCBLoader requirement).
         - Iterate all frames.
-        - Serialize each frame's dict to `<out_dir>/<frame_idx>.pkl`.
+        - Serialize each frame's dict to `<out_dir>/<frame_idx>.pkl`, or, when
+          `per_frame` is False, stream all of them into `<out_dir>/frames.pkl`.
         """
+        if self.skip_existing and self._up_to_date(seq_ref, side):
+            print(f"[skip] {seq_ref}: up to date")
+            return
+
         # Normalize the sequence reference into your canonical path/key
         loader_key = str(seq_ref).replace(os.sep, "/")
 
         # Construct the per-sequence data loader (order comes from your config)
         loader = DexYCBLoader(loader_key, order=self.order)
+        self._export(loader, seq_ref, side)
+        self._write_stamp(seq_ref, side)
+
+    def process_batch(self, seq_refs: List[Union[str, Path]], side: str) -> None:
+        """
+        Process several sequences (typically one subject) with one batched MANO
+        forward per (side, betas) on `self.device`, then export each as in `process`.
+        """
+        if self.skip_existing:
+            seq_refs = [ref for ref in seq_refs if not self._up_to_date(ref, side)]
+        loaders = [DexYCBLoader(str(ref).replace(os.sep, "/"), order=self.order, compute_joints=False)
+                   for ref in seq_refs]
+        if not loaders:
+            return
+        DexYCBLoader.set_joints_batch(loaders, device=self.device)
+        for seq_ref, loader in zip(seq_refs, loaders):
+            self._export(loader, seq_ref, side)
+            self._write_stamp(seq_ref, side)
+
+    def _export(self, loader: DexYCBLoader, seq_ref: Union[str, Path], side: str) -> None:
+        """Write the frames of an already loaded sequence."""
+        loader_key = loader.seq_name
 
         # Total number of frames in this sequence (property on the loader)
         num_frames = loader.get_num_frames
 
-        # Destination directory for this sequence’s per-frame pickles
+        # Destination directory for this sequence’s per-frame pickles (created once, here)
         out_dir = self.out_dir(seq_ref, side)
+        # Invalidate the previous stamp first, so an interrupted export is never "up to date"
+        (out_dir / _STAMP).unlink(missing_ok=True)
+
+        if self.npz:
+            # Structure of arrays: one (T, ...) array per field, strings in a JSON sidecar
+            arrays = loader.as_batch()
+            meta = {k: v for k, v in loader.as_dict().items() if k not in arrays}
+            meta["handBeta"] = np.asarray(meta["handBeta"]).tolist()
+            np.savez_compressed(out_dir / "seq.npz", **arrays)
+            (out_dir / "meta.json").write_text(json.dumps(meta))
+            print(f"[done] {loader_key}: {num_frames} frames -> {out_dir / 'seq.npz'}")
+            return
+
+        if self.msgpack:
+            self._export_msgpack(loader, out_dir)
+            return
+
+        if self.zstd:
+            self._export_zstd(loader, out_dir)
+            return
+
+        if not self.per_frame:
+            # One file and one Pickler for the whole sequence; the shared memo
+            # deduplicates repeated keys/values (seqName, handBeta, ...) across frames.
+            out_file = out_dir / "frames.pkl"
+            # 1 MiB buffers: the pickler's frames and the sidecar's small length/array
+            # writes coalesce into few large write() calls
+            with out_file.open("wb", buffering=1 << 20) as f, \
+                    self._open_buffers(out_file, buffering=1 << 20) as buf_f:
+                pickler = pickle.Pickler(f, protocol=self.protocol, buffer_callback=_buffer_writer(buf_f))
+                for frame_idx in range(num_frames):
+                    pickler.dump(loader.as_dict(frame_idx))
+            print(f"[done] {loader_key}: {num_frames} frames -> {out_dir / 'frames.pkl'}")
+            return
 
-        for frame_idx in range(num_frames):
-            # Build a per-frame dictionary (must contain only pickle-able objects)
-            frame_dict = loader.as_dict(frame_idx)
+        shared_ids: Dict[int, str] = {}
+        if self.shared:
+            # as_dict(frame) reuses the same constant objects for every frame: pickle them
+            # once here and let each frame refer to them by key (see _SharedPickler)
+            per_frame = loader.as_batch().keys() | {"frame"}
+            shared = {k: v for k, v in loader.as_dict(0).items() if k not in per_frame} if num_frames else {}
+            with (out_dir / _SHARED).open("wb") as f:
+                pickle.dump(shared, f, protocol=self.protocol)
+            shared_ids = {id(v): k for k, v in shared.items()}
+        else:
+            (out_dir / _SHARED).unlink(missing_ok=True)
 
-            # Ensure output directory exists (can be hoisted outside loop for micro-perf)
-            out_dir.mkdir(parents=True, exist_ok=True)
+        # Zero-padded file names 0000.pkl, 0001.pkl, ... as plain strings (no Path per frame)
+        out_tmpl = os.path.join(out_dir, "{:04d}.pkl")
+        # Pickle here, write on a background thread: file I/O overlaps the next frame
+        with _BackgroundWriter() as writer:
+            for frame_idx in range(num_frames):
+                # Build a per-frame dictionary (must contain only pickle-able objects)
+                frame_dict = loader.as_dict(frame_idx)
 
-            # Write as zero-padded file names: 0000.pkl, 0001.pkl, ...
-            out_file = out_dir / f"{frame_idx:04d}.pkl"
-            with out_file.open("wb") as f:
-                pickle.dump(frame_dict, f, protocol=pickle.HIGHEST_PROTOCOL)
+                out_file = out_tmpl.format(frame_idx)
+                with self._open_buffers(out_file) as buf_f:
+                    if shared_ids:
+                        data = _SharedPickler.dumps(frame_dict, shared_ids, self.protocol, _buffer_writer(buf_f))
+                    else:
+                        data = pickle.dumps(frame_dict, protocol=self.protocol, buffer_callback=_buffer_writer(buf_f))
+                writer.put(out_file, data)
 
         # Simple progress/logging line
         print(f"[done] {loader_key}: {num_frames} frames -> {out_dir}")
 
+    def _export_msgpack(self, loader: DexYCBLoader, out_dir: Path) -> None:
+        """msgpack variant of `_export` (honours `per_frame`; `protocol5` does not apply)."""
+        if msgpack is None:
+            raise ImportError("msgpack=True requires the 'msgpack' package (pip install msgpack)")
+        packer = msgpack.Packer(default=_pack_ndarray, use_bin_type=True)
+        num_frames = loader.get_num_frames
+
+        if not self.per_frame:
+            out_file = out_dir / "frames.msgpack"
+            with out_file.open("wb", buffering=1 << 20) as f:
+                for frame_idx in range(num_frames):
+                    f.write(packer.pack(loader.as_dict(frame_idx)))
+        else:
+            out_file = out_dir
+            out_tmpl = os.path.join(out_dir, "{:04d}.msgpack")
+            with _BackgroundWriter() as writer:
+                for frame_idx in range(num_frames):
+                    writer.put(out_tmpl.format(frame_idx), packer.pack(loader.as_dict(frame_idx)))
+        print(f"[done] {loader.seq_name}: {num_frames} frames -> {out_file}")
+
+    def _export_zstd(self, loader: DexYCBLoader, out_dir: Path) -> None:
+        """zstd variant of `_export` for pickles (honours `per_frame`; arrays stay in-band)."""
+        if zstandard is None:
+            raise ImportError("zstd=True requires the 'zstandard' package (pip install zstandard)")
+        if self.protocol5:
+            raise ValueError("zstd=True compresses the whole pickle; it cannot be combined with protocol5")
+        num_frames = loader.get_num_frames
+
+        if not self.per_frame:
+            # One compressed stream; the shared pickle memo works as with frames.pkl
+            out_file = out_dir / "frames.pkl.zst"
+            with out_file.open("wb") as raw, \
+                    zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=False) as f:
+                pickler = pickle.Pickler(f, protocol=self.protocol)
+                for frame_idx in range(num_frames):
+                    pickler.dump(loader.as_dict(frame_idx))
+            print(f"[done] {loader.seq_name}: {num_frames} frames -> {out_file}")
+            return
+
+        # Frames of a sequence are near-identical in structure: a small dictionary trained
+        # on the first ones lets each ~1 KB frame compress well on its own
+        frames = (pickle.dumps(loader.as_dict(i), protocol=self.protocol) for i in range(num_frames))
+        head = [next(frames) for _ in range(min(16, num_frames))]
+        try:
+            zdict = zstandard.train_dictionary(16 << 10, head)
+            (out_dir / "zstd.dict").write_bytes(zdict.as_bytes())
+        except zstandard.ZstdError:  # too few/small samples: compress without a dictionary
+            zdict = None
+            (out_dir / "zstd.dict").unlink(missing_ok=True)
+        cctx = zstandard.ZstdCompressor(level=3, dict_data=zdict)
+
+        out_tmpl = os.path.join(out_dir, "{:04d}.pkl.zst")
+        with _BackgroundWriter() as writer:
+            for frame_idx, data in enumerate(chain(head, frames)):
+                writer.put(out_tmpl.format(frame_idx), cctx.compress(data))
+        print(f"[done] {loader.seq_name}: {num_frames} frames -> {out_dir}")
+
     def process_all(self):
         """
         Load the split file at `self.yml` and process sequences for the configured side(s).
         Notes
         `self.side` can be "left", "right", or "both".
-        `self.yml` should be a YAML produced by HandSplitIndex, with top-level keys
-    """
+        `self.yml` should be a YAML produced by HandSplitIndex (keys data_root, left, right).
+        Sequences are independent, since each writes its own directory. On the CPU they
+        run on a pool of `self.workers` processes (1 runs them in this process).
+        With a CUDA `device`, each subject's sequences are exported together by
+        `process_batch`, in this process.
+        With `skip_existing`, sequences whose export is current are skipped.
+        """
         # Normalize to a list of sides to iterate over.
         # If "both", handle left then right; otherwise just the requested side.
         sides = ["left", "right"] if self.side == "both" else [self.side]
@@ -158,11 +455,279 @@ class DexYCBPickleExporter:
                 self.yml, side=side, absolute=True
             )
 
-            # Process each sequence one-by-one using the class's per-sequence routine.
-            for seq_ref in files:
-                # `seq_ref` is typically the sequence directory (e.g., .../<SEQ_NAME>/)
-                # and will be consumed by `process`.
-                self.process(seq_ref, side)
+            # `seq_ref` is typically the sequence directory (e.g., .../<SEQ_NAME>/)
+            # and will be consumed by `process`.
+            if self.device != "cpu":
+                # GPU: batch the MANO pass over each subject's sequences, in this process
+                by_subject: Dict[str, List[Path]] = {}
+                for seq_ref in files:
+                    by_subject.setdefault(Path(seq_ref).parent.name, []).append(seq_ref)
+                for seq_refs in by_subject.values():
+                    self.process_batch(seq_refs, side)
+                continue
+
+            if self.workers == 1:
+                for seq_ref in files:
+                    self.process(seq_ref, side)
+                continue
+
+            workers = self.workers or os.cpu_count()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as ex:
+                # Consume the iterator so worker exceptions are re-raised here. Each
+                # sequence is heavy (seconds), so hand them out one at a time for balance.
+                list(ex.map(self.process, files, repeat(side), chunksize=1))
+
+
+def _init_worker() -> None:
+    """Pool initializer: one intra-op thread and no CUDA per worker, so processes don't oversubscribe."""
+    os.environ["CUDA_VISIBLE_DEVICES"] = ""
+    torch.set_num_threads(1)
+
+
+# ------------------------ out-of-band buffers ------------------------
+def _write_bytes(path: Union[str, Path], data: bytes) -> None:
+    """
+    Write `data` to `path` with a single unbuffered os.write (no file object per frame).
+    The parent directory must already exist: `out_dir()` creates it once per sequence.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+class _SharedPickler(pickle.Pickler):
+    """Pickler that writes objects listed in `shared_ids` (id -> key) as persistent ids."""
+
+    def __init__(self, file, shared_ids: Dict[int, str], protocol: int, buffer_callback=None):
+        super().__init__(file, protocol=protocol, buffer_callback=buffer_callback)
+        self._shared_ids = shared_ids
+
+    def persistent_id(self, obj):
+        return self._shared_ids.get(id(obj))
+
+    @classmethod
+    def dumps(cls, obj, shared_ids: Dict[int, str], protocol: int, buffer_callback=None) -> bytes:
+        buf = io.BytesIO()
+        cls(buf, shared_ids, protocol, buffer_callback).dump(obj)
+        return buf.getvalue()
+
+
+class _SharedUnpickler(pickle.Unpickler):
+    """Unpickler resolving `_SharedPickler` persistent ids from a sequence's shared.pkl."""
+
+    def __init__(self, file, shared: Dict[str, Any], buffers=None):
+        super().__init__(file, buffers=buffers)
+        self._shared = shared
+
+    def persistent_load(self, pid):
+        try:
+            return self._shared[pid]
+        except KeyError:
+            raise pickle.UnpicklingError(f"unknown shared object {pid!r}") from None
+
+
+@functools.lru_cache(maxsize=16)
+def _load_shared(path: str, mtime_ns: int) -> Dict[str, Any]:
+    """
+    A sequence's shared.pkl, loaded once while the file is unchanged. Every frame of
+    the sequence gets the same objects, so arrays are made read-only: an in-place edit
+    to one frame's handBeta would otherwise leak into the others.
+    """
+    with open(path, "rb") as f:
+        shared = pickle.load(f)
+    for v in shared.values():
+        if isinstance(v, np.ndarray):
+            v.flags.writeable = False
+    return shared
+
+
+class _BackgroundWriter:
+    """
+    Write (path, bytes) items with `_write_bytes` on one thread behind a bounded queue,
+    so the producer's pickling overlaps the writes (os.write releases the GIL).
+    A write error stops further writes and is re-raised by `put` / on exit.
+    """
+
+    def __init__(self, maxsize: int = 8):
+        self._queue: "queue.Queue" = queue.Queue(maxsize)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is None:
+                try:
+                    _write_bytes(*item)
+                except BaseException as e:  # surfaced in the producer thread
+                    self._error = e
+
+    def put(self, path: Union[str, Path], data: bytes) -> None:
+        if self._error is not None:
+            raise self._error
+        self._queue.put((path, data))
+
+    def __enter__(self) -> "_BackgroundWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        if exc_type is None and self._error is not None:
+            raise self._error
+
+
+def _buffer_writer(buf_f):
+    """Return a buffer_callback appending each PickleBuffer to `buf_f` as <u64 length><bytes>."""
+    if buf_f is None:
+        return None
+
+    def callback(buf: pickle.PickleBuffer) -> None:
+        raw = buf.raw()
+        buf_f.write(raw.nbytes.to_bytes(8, "little"))
+        buf_f.write(raw)
+        # Returning a falsy value keeps the buffer out-of-band.
+
+    return callback
+
+
+def _read_buffers(pkl_path: Path) -> Optional[Iterator[memoryview]]:
+    """Yield the buffers stored in the `.buf` sidecar of `pkl_path` (None if there is no sidecar)."""
+    buf_path = pkl_path.with_suffix(".buf")
+    if not buf_path.exists():
+        return None
+
+    # One read into a writable buffer; arrays are rebuilt as views over it.
+    data = bytearray(buf_path.stat().st_size)
+    with buf_path.open("rb") as f:
+        f.readinto(data)
+    view = memoryview(data)
+
+    def gen():
+        pos = 0
+        while pos < len(view):
+            n = int.from_bytes(view[pos:pos + 8], "little")
+            pos += 8
+            yield view[pos:pos + n]
+            pos += n
+
+    return gen()
+
+
+# ------------------------ msgpack frames ------------------------
+def _pack_ndarray(obj):
+    """msgpack `default` hook: ndarrays become ext types holding (dtype, shape, raw bytes)."""
+    if isinstance(obj, np.ndarray):
+        arr = np.ascontiguousarray(obj)
+        return msgpack.ExtType(_NDARRAY_EXT,
+                               msgpack.packb((arr.dtype.str, arr.shape, memoryview(arr).cast("B")),
+                                             use_bin_type=True))
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"cannot msgpack-encode {type(obj).__name__}")
+
+
+def _unpack_ext(code: int, data: bytes):
+    """msgpack `ext_hook`: rebuild ndarrays as (read-only) views over the decoded bytes."""
+    if code != _NDARRAY_EXT:
+        return msgpack.ExtType(code, data)
+    dtype, shape, buf = msgpack.unpackb(data, raw=False)
+    return np.frombuffer(buf, dtype=dtype).reshape(shape)
+
+
+def _unpacker(f=None):
+    if msgpack is None:
+        raise ImportError("reading .msgpack frames requires the 'msgpack' package (pip install msgpack)")
+    return msgpack.Unpacker(f, ext_hook=_unpack_ext, raw=False, strict_map_key=False)
+
+
+# ------------------------ zstd frames ------------------------
+@functools.lru_cache(maxsize=16)
+def _zstd_decompressor(dict_path: str, mtime_ns: int) -> "zstandard.ZstdDecompressor":
+    """Decompressor for one sequence's `zstd.dict` (cached while the file is unchanged)."""
+    return zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(Path(dict_path).read_bytes()))
+
+
+def _read_zstd_frame(path: Path) -> bytes:
+    if zstandard is None:
+        raise ImportError("reading .zst frames requires the 'zstandard' package (pip install zstandard)")
+    dict_path = path.with_name("zstd.dict")
+    try:
+        dctx = _zstd_decompressor(os.fspath(dict_path), dict_path.stat().st_mtime_ns)
+    except FileNotFoundError:  # sequence was compressed without a dictionary
+        dctx = zstandard.ZstdDecompressor()
+    return dctx.decompress(path.read_bytes())
+
+
+def load_frame(path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Load one per-frame file: a pickle (picking up its `.buf` sidecar if it was written
+    with protocol5), a zstd-compressed `.pkl.zst` or a `.msgpack` frame.
+    """
+    path = Path(path)
+    if path.suffix == ".zst":
+        return pickle.loads(_read_zstd_frame(path))
+    if path.suffix == ".msgpack":
+        unpacker = _unpacker()
+        unpacker.feed(path.read_bytes())
+        return unpacker.unpack()
+    shared_path = path.with_name(_SHARED)
+    with path.open("rb") as f:
+        if shared_path.exists():
+            shared = _load_shared(os.fspath(shared_path), shared_path.stat().st_mtime_ns)
+            return _SharedUnpickler(f, shared, buffers=_read_buffers(path)).load()
+        return pickle.load(f, buffers=_read_buffers(path))
+
+
+def iter_frames(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the frame dicts of a `frames.pkl` written with `per_frame=False`, in order.
+    A single Unpickler is required because the writer shares its memo across frames,
+    so the stream has no per-frame offsets; export with `npz=True` for random access.
+    `frames.msgpack` (msgpack=True) and `frames.pkl.zst` (zstd=True) streams are read the same way.
+    """
+    path = Path(path)
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise ImportError("reading .zst frames requires the 'zstandard' package (pip install zstandard)")
+        with path.open("rb") as raw, zstandard.ZstdDecompressor().stream_reader(raw) as r:
+            unpickler = pickle.Unpickler(io.BufferedReader(r, 1 << 20))
+            while True:
+                try:
+                    yield unpickler.load()
+                except EOFError:
+                    return
+    if path.suffix == ".msgpack":
+        with path.open("rb") as f:
+            yield from _unpacker(f)
+        return
+    with path.open("rb") as f:
+        unpickler = pickle.Unpickler(f, buffers=_read_buffers(path))
+        while True:
+            try:
+                yield unpickler.load()
+            except EOFError:
+                return
+
+
+def load_sequence(out_dir: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Load a sequence written with `npz=True` as one dict of full-sequence fields
+    (same keys as `DexYCBLoader.as_dict()`); index the arrays by frame directly.
+    """
+    out_dir = Path(out_dir)
+    seq = json.loads((out_dir / "meta.json").read_text())
+    seq["handBeta"] = np.asarray(seq["handBeta"], dtype=np.float32)
+    with np.load(out_dir / "seq.npz") as z:
+        seq.update((k, z[k]) for k in z.files)
+    return seq
 
 
 if __name__ == "__main__":
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import numpy as np
+import torch
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dexycbloader import DexYCBLoader
+from processor import DexYCBPickleExporter, load_sequence
+
+
+def _fake_sequence(root, seq="20200709-subject-01/s1", T=4):
+    """Minimal DexYCB tree: one sequence plus its MANO calibration."""
+    calib = root / "calibration" / "mano_c1"
+    calib.mkdir(parents=True)
+    (calib / "mano.yml").write_text(yaml.safe_dump({"betas": [i / 10 for i in range(10)]}))
+    seq_dir = root / seq
+    seq_dir.mkdir(parents=True)
+    (seq_dir / "meta.yml").write_text(yaml.safe_dump(
+        {"mano_sides": ["right"], "mano_calib": ["c1"], "ycb_ids": [2, 5], "ycb_grasp_ind": 1, "num_frames": T}))
+    q = np.tile([1.0, 0.0, 0.0, 0.0], (T, 2, 1))
+    np.savez(seq_dir / "pose.npz",
+             pose_m=np.random.rand(T, 1, 51).astype(np.float32),
+             pose_y=np.concatenate([q, np.random.rand(T, 2, 3)], -1).astype(np.float32))
+    return seq
+
+
+def test_load_sequence_matches_as_dict_dtypes(tmp_path, monkeypatch):
+    monkeypatch.setenv("DEX_YCB_DIR", str(tmp_path / "dex"))
+    seq = _fake_sequence(tmp_path / "dex")
+    loader = DexYCBLoader(seq, order="mano", compute_joints=False)
+    loader._store_joints(torch.zeros(loader.get_num_frames, 21, 3))
+
+    exporter = DexYCBPickleExporter(out_root=tmp_path / "out", side="right", npz=True)
+    exporter._export(loader, seq, "right")
+    loaded = load_sequence(exporter.out_dir(seq, "right", create=False))
+
+    for k, v in loader.as_dict().items():
+        if isinstance(v, np.ndarray):
+            assert loaded[k].dtype == v.dtype, k
+            assert np.array_equal(loaded[k], v), k
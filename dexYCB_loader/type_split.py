@@ -2,9 +2,54 @@ from __future__ import annotations
 
 import os
 import csv
+import copy
 import yaml
+import functools
+import pickle
 from pathlib import Path
-from typing import Dict, List, Iterable, Union, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Iterable, Iterator, Union, Optional, Tuple
+
+try:
+    from yaml import CSafeLoader as _YamlLoader, CSafeDumper as _YamlDumper
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _YamlLoader, SafeDumper as _YamlDumper
+
+
+@functools.lru_cache(maxsize=128)
+def _parse_yaml(path: str, mtime_ns: int, size: int) -> Any:
+    """Parse `path` with the libyaml loader; (mtime_ns, size) are part of the key so edits re-parse."""
+    with open(path, "rb") as f:
+        return yaml.load(f, Loader=_YamlLoader)
+
+
+def load_yaml(path: Union[str, Path]) -> Any:
+    """
+    Parse a YAML file, reusing the result while the file is unchanged (same mtime and size).
+    Returns a deep copy, so callers may mutate it without touching the cached value.
+    """
+    path = os.fspath(path)
+    st = os.stat(path)
+    return copy.deepcopy(_parse_yaml(path, st.st_mtime_ns, st.st_size))
+
+
+def _walk(root: Union[str, Path]) -> Iterator[os.DirEntry]:
+    """Recursively yield `meta.yml` entries under `root` using os.scandir (one stat per entry)."""
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name == "meta.yml" and entry.is_file():
+                    yield entry
+
+
+def _read_sides(meta_path: str) -> Tuple[str, List[str]]:
+    """Parse one meta.yml and return (sequence_dir, mano_sides)."""
+    with open(meta_path, "rb") as f:
+        data = yaml.load(f, Loader=_YamlLoader) or {}
+    return os.path.dirname(meta_path), data.get("mano_sides", [])
 
 
 class HandSplitIndex:
@@ -34,33 +79,66 @@ class HandSplitIndex:
         """Default manifest path: <out_dir>/hand_splits.yaml."""
         return (self.out_dir / "hand_splits.yaml").resolve()
 
+    @staticmethod
+    def _load_cache(cache: Path, sig: tuple) -> Optional[Dict[str, List[str]]]:
+        """Return cached splits if `cache` exists and was written for `sig`, else None."""
+        try:
+            with cache.open("rb") as f:
+                cached_sig, splits = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError):
+            return None
+        return splits if cached_sig == sig else None
+
+    @staticmethod
+    def _save_cache(cache: Path, sig: tuple, splits: Dict[str, List[str]]) -> None:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        with cache.open("wb") as f:
+            pickle.dump((sig, splits), f, protocol=pickle.HIGHEST_PROTOCOL)
+
     # ------------------------- core split -------------------------
-    def split(self, *, relative: bool = True) -> Dict[str, List[str]]:
+    def split(self, *, relative: bool = True, max_workers: int = 32,
+              cache: Optional[Union[str, Path]] = None) -> Dict[str, List[str]]:
         """
         Scan `self.root` for all `meta.yml` files, read `mano_sides`,
         and split sequences into LEFT / RIGHT.
 
+        The files are parsed concurrently (`max_workers` threads) since the
+        scan is dominated by filesystem latency.
+
+        If `cache` is given, the result is stored in that pickle keyed by
+        (root, relative, number of meta.yml files, newest mtime) and reused
+        while the key still matches, so an unchanged dataset is only stat'ed.
+
         Returns a dict with 'left' and 'right' lists of paths (strings),
         relative to `self.root` if `relative=True`, else absolute strings.
         """
         right: List[str] = []
         left: List[str] = []
 
-        meta_files = sorted(self.root.rglob("meta.yml"))
+        entries = list(_walk(self.root))
+        meta_files = sorted(entry.path for entry in entries)
         print(f"[split] found {len(meta_files)} meta.yml files")
 
-        for meta_p in meta_files:
-            seq_dir = meta_p.parent
-
-            with meta_p.open("r", encoding=self.encoding) as f:
-                data = yaml.safe_load(f) or {}
-            sides = data.get("mano_sides", [])
-
+        sig = None
+        if cache is not None:
+            cache = Path(cache)
+            newest = max((entry.stat().st_mtime_ns for entry in entries), default=0)
+            sig = (str(self.root), relative, len(meta_files), newest)
+            cached = self._load_cache(cache, sig)
+            if cached is not None:
+                print(f"[split] cache hit: {cache}")
+                return cached
+
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            results = list(ex.map(_read_sides, meta_files))
+
+        root_str = str(self.root)
+        for seq_dir, sides in results:
             # Normalize path once
             if relative:
-                seq_str = str(seq_dir.relative_to(self.root))
+                seq_str = os.path.relpath(seq_dir, root_str)
             else:
-                seq_str = str(seq_dir.resolve())
+                seq_str = str(Path(seq_dir).resolve())
 
             # Allow both if present (robustness)
             if "right" in sides:
@@ -70,7 +148,10 @@ class HandSplitIndex:
 
         right, left = sorted(set(right)), sorted(set(left))
         print(f"[split] totals: right={len(right)}  left={len(left)}.")
-        return {"right": right, "left": left}
+        splits = {"right": right, "left": left}
+        if cache is not None:
+            self._save_cache(cache, sig, splits)
+        return splits
 
     # ------------------------- writers -------------------------
     def write_csvs(self, splits: Dict[str, Iterable[Union[str, Path]]],
@@ -115,15 +196,16 @@ class HandSplitIndex:
         }
 
         with ypath.open("w", encoding=self.encoding) as f:
-            yaml.safe_dump(manifest, f, sort_keys=False, allow_unicode=True)
+            yaml.dump(manifest, f, Dumper=_YamlDumper, sort_keys=False, allow_unicode=True)
 
         return ypath.resolve()
 
     def build(self, *, relative: bool = True, out_dir: Optional[Union[str, Path]] = None,
-              yaml_path: Optional[Union[str, Path]] = None) -> Path:
+              yaml_path: Optional[Union[str, Path]] = None, cache: bool = True) -> Path:
         """
         End-to-end:
           1) Split sequences by hand from `self.root`
+             (reusing <out_dir>/hand_splits.cache.pkl when `cache` and the dataset is unchanged)
           2) Write left/right CSVs into `out_dir` (or self.out_dir)
           3) Write YAML manifest and return its path
         """
@@ -131,7 +213,8 @@ class HandSplitIndex:
             out_dir = self.out_dir
 
         # 1) split
-        splits = self.split(relative=relative)
+        cache_path = Path(out_dir) / "hand_splits.cache.pkl" if cache else None
+        splits = self.split(relative=relative, cache=cache_path)
 
         # 2) csvs
         left_csv, right_csv = self.write_csvs(splits, out_dir=out_dir)
@@ -147,7 +230,7 @@ class HandSplitIndex:
     # ------------------------- readers -------------------------
     @staticmethod
     def read_paths(index_yaml: Union[str, Path], side: str = "right",
-                   absolute: bool = True, encoding: str = "utf-8") -> List[Path]:
+                   absolute: bool = True, encoding: str = "utf-8", canonicalize: bool = False) -> List[Path]:
         """
         Load a YAML manifest and return the list of sequence paths for one side.
 
@@ -157,6 +240,9 @@ class HandSplitIndex:
           - right: path (relative to the YAML file) to a CSV listing right sequences
 
         CSV format: one path per row (relative to `data_root`).
+
+        `data_root` is resolved once; rows are joined onto it as-is. Pass
+        `canonicalize=True` to also resolve symlinks per row (one lstat per component).
         """
         side_norm = side.strip().lower()
         if side_norm not in ("left", "right"):
@@ -168,7 +254,7 @@ class HandSplitIndex:
             raise FileNotFoundError(f"YAML not found: {yaml_path}")
 
         # Parse the manifest; must include the dataset root and the CSV pointer for the chosen side.
-        manifest = yaml.safe_load(yaml_path.read_text(encoding=encoding))
+        manifest = load_yaml(yaml_path)
         if "data_root" not in manifest or side_norm not in manifest:
             raise KeyError("YAML must contain 'data_root' and a CSV entry for the requested side")
 
@@ -178,18 +264,18 @@ class HandSplitIndex:
         if not csv_path.exists():
             raise FileNotFoundError(f"CSV not found for side '{side_norm}': {csv_path}")
 
+        # Single-column file: read it in one go and split lines (no csv state machine)
         paths: List[Path] = []
-        with csv_path.open("r", newline="", encoding=encoding) as f:
-            for row in csv.reader(f):
-                if not row:
-                    continue
-                raw = row[0].strip()
-                if not raw or raw.startswith("#"):
-                    continue
-                p = Path(raw)
-                if absolute and not p.is_absolute():
-                    p = (data_root / p).resolve()
-                paths.append(p)
+        for raw in csv_path.read_text(encoding=encoding).splitlines():
+            raw = raw.strip()
+            if not raw or raw.startswith("#"):
+                continue
+            p = Path(raw)
+            if absolute and not p.is_absolute():
+                p = data_root / p
+                if canonicalize:
+                    p = p.resolve()
+            paths.append(p)
 
         return paths
 
@@ -3,29 +3,140 @@
 OOP image-sequence → video builder.
 Requires:
   pip install opencv-python
+Optional:
+  pip install PyTurboJPEG  (libjpeg-turbo decode for .jpg frames)
+  ffmpeg on PATH (used by backend='auto'/'ffmpeg'; NVENC/QSV/VideoToolbox when available)
 """
+import os
 import re
 import cv2
+import numpy as np
+import shutil
+import fnmatch
+import functools
+import subprocess
 from pathlib import Path
+from itertools import count, islice
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from typing import Optional, Tuple, List, Sequence
 from find_objs import read_sequence
 
-_NUM = re.compile(r"(\d+)")
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _TJ = TurboJPEG()  # raises if the libturbojpeg shared library is missing
+except Exception:  # optional dependency: fall back to cv2.imread
+    _TJ = None
 
-def _num_key(p: Path):
+_NUM = re.compile(r"(\d+)", re.ASCII)
+_PREFETCH = 8  # frames decoded ahead of the writer
+# imread flags for JPEG DCT-domain downscaling by 1/d
+_IMREAD_REDUCED = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                   4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+# ffmpeg H.264 encoders in order of preference (hardware first) and their presets
+_ENCODERS = ("h264_nvenc", "h264_qsv", "h264_videotoolbox", "libx264")
+_PRESETS = {"h264_nvenc": "p4", "h264_qsv": "veryfast", "libx264": "veryfast"}
+
+def _num_key(name: str):
     """Natural-ish sort: first integer in filename, else fallback to name."""
-    m = _NUM.search(p.name)
-    return (int(m.group(1)) if m else float("inf"), p.name)
+    # DexYCB frames are color_%06d.jpg: slice the digits out without the regex
+    if name.startswith("color_"):
+        digits = name[6:].partition(".")[0]
+        if digits.isascii() and digits.isdigit():
+            return (int(digits), name)
+    m = _NUM.search(name)
+    return (int(m.group(1)) if m else float("inf"), name)
+
+
+@functools.lru_cache(maxsize=None)
+def _pick_encoder(ffmpeg: str) -> str:
+    """
+    First encoder in `_ENCODERS` that actually works here. Being listed by
+    `ffmpeg -encoders` is not enough (e.g. NVENC without a GPU), so each
+    candidate encodes one tiny frame. Cached per process.
+    """
+    for enc in _ENCODERS[:-1]:
+        cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-f", "lavfi", "-i", "color=size=256x256",
+               "-frames:v", "1", "-c:v", enc, "-f", "null", "-"]
+        try:
+            if subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=30).returncode == 0:
+                return enc
+        except (OSError, subprocess.SubprocessError):
+            pass
+    return "libx264"
+
+
+class _FFmpegPipeWriter:
+    """
+    cv2.VideoWriter-compatible sink that pipes raw BGR frames into an ffmpeg process,
+    so encoding runs in ffmpeg's own (multithreaded) C pipeline.
+    """
+
+    def __init__(self, ffmpeg: str, output: Path, fps: int, size: Tuple[int, int],
+                 encoder: str = "libx264"):
+        w, h = size
+        preset = ["-preset", _PRESETS[encoder]] if encoder in _PRESETS else []
+        cmd = [
+            ffmpeg, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{w}x{h}", "-r", str(fps), "-i", "-",
+            # yuv420p needs even dimensions; pad by one pixel when necessary
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-c:v", encoder, *preset, "-pix_fmt", "yuv420p", str(output),
+        ]
+        self.output = output
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def isOpened(self) -> bool:
+        return self.proc.poll() is None
+
+    def write(self, img) -> None:
+        # imread/resize return C-contiguous arrays: hand ffmpeg the buffer without a copy
+        try:
+            self.proc.stdin.write(img.data)
+        except BrokenPipeError:
+            raise RuntimeError(f"ffmpeg exited ({self.proc.wait()}) while writing {self.output}") from None
+
+    def release(self) -> None:
+        if self.proc.stdin and not self.proc.stdin.closed:
+            try:
+                self.proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        if self.proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed ({self.proc.returncode}) writing {self.output}")
+
+
+def _init_worker() -> None:
+    """Pool initializer: one OpenCV thread per process, so N processes don't oversubscribe cores."""
+    cv2.setNumThreads(1)
+
+
+def _build_one(cls, inp: Path, out_root: Optional[Path], kwargs: dict) -> Path:
+    """Build one video for `build_many` (module level so it can be sent to worker processes)."""
+    name = inp.name
+    sub  = inp.parent.name
+    inp = Path(inp) / "836212060125"
+    if out_root:
+        out_path = Path(out_root) / sub / name
+        out_path.mkdir(parents=True, exist_ok=True)
+        out_path = Path(out_path) / f"{name}.mp4"
+    else:
+        out_path = inp.parent / f"{name}.mp4"
+    return cls(input_dir=inp, output=out_path, **kwargs).build()
+
 
 class ImageSequenceToVideo:
     """
-    Build a video from a folder of JPG images.
+    Build a video from a folder of JPG images (or re-encode an existing video
+    keeping every `stride`-th frame, see `input_video`).
 
     Parameters
-    input_dir : str | Path
-        Folder containing frames (e.g., color_000001.jpg ...).
+    input_dir : str | Path | None
+        Folder containing frames (e.g., color_000001.jpg ...). May be None with `input_video`.
     output : str | Path | None
-        Output video path. If None, defaults to <input_dir>.mp4 in the parent.
+        Output video path. If None, defaults to <input_dir>.mp4 in the parent
+        (or <video stem>_stride<N>.mp4 next to `input_video`).
     fps : int
         Frames per second.
     size : (int, int) | None
@@ -36,28 +147,62 @@ class ImageSequenceToVideo:
         FourCC code (e.g., 'mp4v', 'XVID'). If None, inferred from output suffix.
     stride : int
         Use every Nth frame (>=1).
+    workers : int
+        Decoder threads reading frames ahead of the writer (cv2 releases the GIL).
+    backend : str
+        'cv2' (cv2.VideoWriter), 'ffmpeg' (pipe raw frames into ffmpeg/libx264), or
+        'auto': ffmpeg when it is on PATH and no FourCC `codec` was requested, else cv2.
+        'ffmpeg-copy': hand the .jpg files to ffmpeg as-is (image2pipe demuxer), so Python
+        never decodes them; the JPEGs are stream-copied as MJPEG unless `encoder`/`size`
+        is given, then ffmpeg decodes and re-encodes them in one pass. With `input_video`
+        it behaves like 'ffmpeg'.
+    encoder : str | None
+        ffmpeg video encoder (e.g. 'h264_nvenc', 'libx264'). If None, the first working
+        of NVENC, QSV, VideoToolbox is used, falling back to libx264.
+    input_video : str | Path | None
+        Read frames from this video instead of `input_dir`. Dropped frames are only
+        grab()'ed; retrieve() (frame conversion to BGR) runs for the kept ones.
     """
 
-    def __init__(self, input_dir: str, output: Optional[str] = None, fps: int = 15,
+    def __init__(self, input_dir: Optional[str], output: Optional[str] = None, fps: int = 15,
         size: Optional[Tuple[int, int]] = None, pattern: str = "*.jpg", codec: Optional[str] = None,
-        stride: int = 1,
+        stride: int = 1, workers: int = 4, backend: str = "auto", encoder: Optional[str] = None,
+        input_video: Optional[str] = None,
     ):
-        self.input_dir = Path(input_dir)
-        if output is None:
-            self.output = self.input_dir.parent / f"{self.input_dir.name}.mp4"
-        else:
+        if input_dir is None and input_video is None:
+            raise ValueError("either input_dir or input_video is required")
+        self.input_dir = Path(input_dir) if input_dir is not None else None
+        self.input_video = Path(input_video) if input_video is not None else None
+        self.stride = max(1, int(stride))
+        if output is not None:
             self.output = Path(output)
+        elif self.input_video is not None:
+            self.output = self.input_video.with_name(f"{self.input_video.stem}_stride{self.stride}.mp4")
+        else:
+            self.output = self.input_dir.parent / f"{self.input_dir.name}.mp4"
         self.fps = int(fps)
         self.size = size  # (w, h)
         self.pattern = pattern
         self.codec = codec
-        self.stride = max(1, int(stride))
+        self.workers = max(1, int(workers))
+        self.backend = backend
+        self.encoder = encoder
+        self._reduce = 1  # JPEG DCT downscale (1, 2, 4, 8) applied while decoding, see _pick_reduce
+        self._auto_hw = False  # True once a probed hardware encoder is in use (see build)
 
     def _collect_frames(self) -> List[Path]:
         if not self.input_dir.is_dir():
             raise NotADirectoryError(f"Input folder not found: {self.input_dir}")
-        files = sorted(self.input_dir.glob(self.pattern), key=_num_key)
-        files = files[::self.stride]
+        # One scandir pass: DirEntry.is_file() reuses the directory read, no per-file stat
+        pat = re.compile(fnmatch.translate(self.pattern))
+        hidden_ok = self.pattern.startswith(".")  # glob semantics: '*' skips dotfiles
+        entries = []
+        with os.scandir(self.input_dir) as it:
+            for e in it:
+                if (hidden_ok or not e.name.startswith(".")) and pat.match(e.name) and e.is_file():
+                    entries.append((_num_key(e.name), e.path))
+        entries.sort()
+        files = [Path(path) for _, path in entries[::self.stride]]
         if not files:
             raise FileNotFoundError(f"No frames matched pattern '{self.pattern}' in {self.input_dir}")
         return files
@@ -72,8 +217,173 @@ class ImageSequenceToVideo:
             return "XVID"
         return "mp4v"
 
+    def _open_writer(self):
+        """Open the frame sink for the selected backend."""
+        if self.backend not in ("auto", "cv2", "ffmpeg", "ffmpeg-copy"):
+            raise ValueError(f"Unknown backend: {self.backend!r}")
+        backend = "ffmpeg" if self.backend == "ffmpeg-copy" else self.backend
+        ffmpeg = shutil.which("ffmpeg")
+        if backend == "ffmpeg" and ffmpeg is None:
+            raise RuntimeError(f"backend={self.backend!r} but no ffmpeg executable found on PATH")
+        if ffmpeg is not None and (backend == "ffmpeg" or (backend == "auto" and not self.codec)):
+            return _FFmpegPipeWriter(ffmpeg, self.output, self.fps, self.size,
+                                     encoder=self._encoder(ffmpeg))
+
+        fourcc = cv2.VideoWriter_fourcc(*self._infer_codec())
+        return cv2.VideoWriter(str(self.output), fourcc, self.fps, self.size)
+
+    def _read_frame(self, p: Path, dst: Optional[np.ndarray] = None):
+        """
+        Decoder-stage work for one frame: imread + resize to `self.size` (None if unreadable).
+        `dst` is an optional preallocated (h, w, 3) uint8 buffer the resize writes into.
+        """
+        jpeg = p.suffix.lower() in (".jpg", ".jpeg")
+        d = self._reduce if jpeg else 1
+        if _TJ is not None and jpeg:
+            try:
+                with open(p, "rb") as f:
+                    img = _TJ.decode(f.read(), pixel_format=TJPF_BGR,
+                                     scaling_factor=(1, d) if d > 1 else None)
+            except (OSError, ValueError):
+                return None
+        else:
+            img = cv2.imread(str(p), _IMREAD_REDUCED[d])
+        if img is None:
+            return None
+        h, w = img.shape[:2]
+        if (w, h) != self.size:
+            img = cv2.resize(img, self.size, dst=dst, interpolation=cv2.INTER_AREA)
+        return img
+
+    def _pick_reduce(self, first: Path) -> int:
+        """
+        Largest JPEG scale-down 1/d (d in 8, 4, 2) whose decoded size still covers
+        `self.size`, from the first frame (DexYCB frames share one resolution).
+        libjpeg skips the dropped DCT coefficients, so decode + the final resize
+        touch up to 64x fewer pixels than a full decode.
+        """
+        if first.suffix.lower() not in (".jpg", ".jpeg"):
+            return 1
+        try:
+            if _TJ is not None:
+                src_w, src_h = _TJ.decode_header(first.read_bytes())[:2]
+            else:
+                src_h, src_w = cv2.imread(str(first)).shape[:2]
+        except (OSError, ValueError, AttributeError):  # unreadable first frame: decode at full size
+            return 1
+        w, h = self.size
+        for d in (8, 4, 2):
+            if -(-src_w // d) >= w and -(-src_h // d) >= h:
+                return d
+        return 1
+
+    def _build_from_video(self) -> Path:
+        """`build` for `input_video`: keep every `stride`-th frame of the source video."""
+        cap = cv2.VideoCapture(str(self.input_video))
+        if not cap.isOpened():
+            raise RuntimeError(f"Could not open input video: {self.input_video}")
+        if self.size is None:
+            self.size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        writer = self._open_writer()
+        if not writer.isOpened():
+            cap.release()
+            raise RuntimeError(f"Could not open writer for {self.output}")
+
+        # Reused frame buffers: no per-frame allocation for decode or resize
+        raw = None
+        resized = np.empty((self.size[1], self.size[0], 3), np.uint8)
+        try:
+            for i in count():
+                # grab() advances the stream; only kept frames pay for retrieve()
+                if not cap.grab():
+                    break
+                if i % self.stride:
+                    continue
+                ok, img = cap.retrieve(raw)
+                if not ok:
+                    print(f"[warn] skip unreadable frame {i} of {self.input_video}")
+                    continue
+                raw = img  # retrieve() decodes into this array from now on
+                h, w = img.shape[:2]
+                if (w, h) != self.size:
+                    img = cv2.resize(img, self.size, dst=resized, interpolation=cv2.INTER_AREA)
+                writer.write(img)
+        finally:
+            cap.release()
+            writer.release()
+        return self.output
+
+    def _build_ffmpeg_copy(self, frames: List[Path]) -> Path:
+        """`build` for backend='ffmpeg-copy': stream the JPEG files' bytes into ffmpeg."""
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise RuntimeError("backend='ffmpeg-copy' but no ffmpeg executable found on PATH")
+        bad = next((p for p in frames if p.suffix.lower() not in (".jpg", ".jpeg")), None)
+        if bad is not None:
+            raise ValueError(f"backend='ffmpeg-copy' needs JPEG frames, got {bad}")
+
+        if self.encoder is None and self.size is None:
+            codec = ["-c:v", "copy"]  # MJPEG: the JPEGs are muxed untouched
+        else:
+            encoder = self._encoder(ffmpeg)
+            scale = f"scale={self.size[0]}:{self.size[1]}:flags=area," if self.size else ""
+            preset = ["-preset", _PRESETS[encoder]] if encoder in _PRESETS else []
+            codec = ["-vf", scale + "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+                     "-c:v", encoder, *preset, "-pix_fmt", "yuv420p"]
+        cmd = [ffmpeg, "-y", "-loglevel", "error",
+               "-f", "image2pipe", "-framerate", str(self.fps), "-c:v", "mjpeg", "-i", "-",
+               *codec, str(self.output)]
+
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        try:
+            for p in frames:
+                try:
+                    data = p.read_bytes()
+                except OSError:
+                    print(f"[warn] skip unreadable frame: {p}")
+                    continue
+                proc.stdin.write(data)
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass  # ffmpeg exited early; its return code is reported below
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed ({proc.returncode}) writing {self.output}")
+        return self.output
+
+    def _encoder(self, ffmpeg: str) -> str:
+        """The requested `encoder`, else the probed one (remembering if it is a hardware encoder)."""
+        if self.encoder:
+            return self.encoder
+        enc = _pick_encoder(ffmpeg)
+        self._auto_hw = enc != "libx264"
+        return enc
+
     def build(self) -> Path:
+        """
+        Build the video. If an auto-selected hardware encoder fails (e.g. the GPU's
+        concurrent NVENC session limit is hit when `build_many` runs many ffmpegs),
+        the video is rebuilt once with libx264.
+        """
+        self._auto_hw = False
+        try:
+            return self._build()
+        except RuntimeError as e:
+            if not self._auto_hw:
+                raise
+            print(f"[warn] hardware encoder failed for {self.output} ({e}); retrying with libx264")
+            self.encoder = "libx264"
+            return self._build()
+
+    def _build(self) -> Path:
+        if self.input_video is not None:
+            return self._build_from_video()
+
         frames = self._collect_frames()
+        if self.backend == "ffmpeg-copy":
+            return self._build_ffmpeg_copy(frames)
 
         # Determine size
         if self.size is None:
@@ -82,33 +392,49 @@ class ImageSequenceToVideo:
                 raise RuntimeError(f"Failed to read first frame: {frames[0]}")
             h, w = first.shape[:2]
             self.size = (w, h)
+        else:
+            self._reduce = self._pick_reduce(frames[0])
 
         self.output.parent.mkdir(parents=True, exist_ok=True)
-        fourcc = cv2.VideoWriter_fourcc(*self._infer_codec())
-        writer = cv2.VideoWriter(str(self.output), fourcc, self.fps, self.size)
+        writer = self._open_writer()
 
         if not writer.isOpened():
             raise RuntimeError(f"Could not open writer for {self.output}")
 
-        for p in frames:
-            img = cv2.imread(str(p))
-            if img is None:
-                print(f"[warn] skip unreadable frame: {p}")
-                continue
-            h, w = img.shape[:2]
-            if (w, h) != self.size:
-                img = cv2.resize(img, self.size, interpolation=cv2.INTER_AREA)
-            writer.write(img)
-
-        writer.release()
+        # Decode (+resize) frames on a thread pool in a rolling window of _PREFETCH
+        # frames, so this thread only feeds the encoder. Resizes go into a ring of
+        # _PREFETCH + 1 buffers: a slot is only reused once its frame was written.
+        w, h = self.size
+        bufs = [np.empty((h, w, 3), np.uint8) for _ in range(_PREFETCH + 1)]
+        todo = enumerate(frames)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for i, p in islice(todo, _PREFETCH):
+                pending.append((p, pool.submit(self._read_frame, p, bufs[i % len(bufs)])))
+            try:
+                while pending:
+                    p, fut = pending.popleft()
+                    nxt = next(todo, None)
+                    if nxt is not None:
+                        i, q = nxt
+                        pending.append((q, pool.submit(self._read_frame, q, bufs[i % len(bufs)])))
+
+                    img = fut.result()
+                    if img is None:
+                        print(f"[warn] skip unreadable frame: {p}")
+                        continue
+                    writer.write(img)
+            finally:
+                writer.release()
         return self.output
 
     @classmethod
     def build_many(cls, input_dirs: Sequence[Path], out_root: Optional[Path] = None, fps: int = 15,
         size: Optional[Tuple[int, int]] = None, pattern: str = "*.jpg", codec: Optional[str] = None,
-        stride: int = 1) -> List[Path]:
+        stride: int = 1, processes: Optional[int] = None, **options) -> List[Path]:
         """
-        Build videos for multiple input folders of frames.
+        Build videos for multiple input folders of frames, one worker process per
+        video at a time (sequences are independent and write separate files).
         Parameters
         input_dirs : list of Path
             List of frame folders (each becomes one video).
@@ -116,26 +442,31 @@ class ImageSequenceToVideo:
             Root output directory. If None, video is placed in each folder’s parent.
         fps, size, pattern, codec, stride
             Same as for single build.
+        processes : int | None
+            Worker processes (default: os.cpu_count(); 1 builds serially in-process).
+        **options
+            Extra constructor arguments (e.g. backend, encoder) passed to every build.
 
         Returns
         List[Path]
             List of output video paths.
         """
+        kwargs = dict(fps=fps, size=size, pattern=pattern, codec=codec, stride=stride, **options)
         outputs: List[Path] = []
-        for inp in input_dirs:
-            name = inp.name
-            sub  = inp.parent.name
-            inp = Path(inp) / "836212060125"
-            if out_root:
-                out_path = Path(out_root) / sub / name
-                out_path.mkdir(parents=True, exist_ok=True)
-                out_path = Path(out_path) / f"{name}.mp4"
-            else:
-                out_path = inp.parent / f"{name}.mp4"
-            video = cls(input_dir=inp, output=out_path, fps=fps, size=size,
-                        pattern=pattern, codec=codec,stride=stride).build()
-            outputs.append(video)
-            print(f"[info] Built video: {video}")
+        if processes == 1:
+            for inp in input_dirs:
+                video = _build_one(cls, inp, out_root, kwargs)
+                outputs.append(video)
+                print(f"[info] Built video: {video}")
+            return outputs
+
+        with ProcessPoolExecutor(max_workers=processes or os.cpu_count(), initializer=_init_worker) as ex:
+            futures = [ex.submit(_build_one, cls, inp, out_root, kwargs) for inp in input_dirs]
+            # Collect in input order so outputs line up with input_dirs
+            for fut in futures:
+                video = fut.result()
+                outputs.append(video)
+                print(f"[info] Built video: {video}")
         return outputs
 
 